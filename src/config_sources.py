@@ -2,10 +2,12 @@
 
 import urllib.request
 import ssl
-import json
-import base64
-from typing import List, Set, Optional
-from .parser import ConfigParser, ProxyConfig
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Set
+from .parser import SUPPORTED_PREFIXES, ConfigParser, ProxyConfig
+
+
+_SUPPORTED_PREFIXES_BYTES = tuple(prefix.encode('ascii') for prefix in SUPPORTED_PREFIXES)
 
 
 class ConfigSourceManager:
@@ -16,6 +18,9 @@ class ConfigSourceManager:
     def __init__(self, timeout: float = 30.0):
         self.timeout = timeout
         self.parser = ConfigParser()
+        self._ssl_ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+        self._ssl_ctx.check_hostname = False
+        self._ssl_ctx.verify_mode = ssl.CERT_NONE
 
     def get_configs_with_fallback(self) -> List[ProxyConfig]:
         configs = self.fetch_all_configs()
@@ -24,65 +29,70 @@ class ConfigSourceManager:
         return configs
 
     def fetch_all_configs(self) -> List[ProxyConfig]:
-        all_lines = []
+        fetched = {}
+
+        with ThreadPoolExecutor(max_workers=len(self.SOURCES)) as executor:
+            futures = {executor.submit(self._fetch_source, url): url for url in self.SOURCES}
+
+            for future in as_completed(futures):
+                source_url = futures[future]
+                source_name = f"{source_url.split('/')[-2]}/{source_url.split('/')[-1]}"
+                try:
+                    lines = future.result()
+                    if lines:
+                        fetched[source_url] = lines
+                        print(f"Fetched {source_name}: OK ({len(lines)} configs)")
+                    else:
+                        print(f"Fetched {source_name}: Empty")
+                except Exception as e:
+                    print(f"Fetched {source_name}: Failed: {str(e)[:40]}")
 
+        all_lines = []
         for source_url in self.SOURCES:
-            try:
-                print(f"Fetching from {source_url.split('/')[-2]}/{source_url.split('/')[-1]}...", end=" ")
-                lines = self._fetch_source(source_url)
-                if lines:
-                    all_lines.extend(lines)
-                    print(f"OK ({len(lines)} configs)")
-                else:
-                    print("Empty")
-            except Exception as e:
-                print(f"Failed: {str(e)[:40]}")
+            all_lines.extend(fetched.get(source_url, ()))
 
         return self.deduplicate(all_lines)
 
     def _fetch_source(self, url: str) -> List[str]:
-        ssl_context = ssl.create_default_context()
-        ssl_context.check_hostname = False
-        ssl_context.verify_mode = ssl.CERT_NONE
-
         headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         }
         req = urllib.request.Request(url, headers=headers)
 
-        with urllib.request.urlopen(req, context=ssl_context, timeout=self.timeout) as response:
-            content = response.read().decode('utf-8', errors='ignore')
-            return [line.strip() for line in content.split('\n') if line.strip()]
+        with urllib.request.urlopen(req, context=self._ssl_ctx, timeout=self.timeout) as response:
+            content = response.read()
+
+        lines = (line.strip() for line in content.split(b'\n'))
+        return [line.decode('utf-8', errors='ignore') for line in lines if line.startswith(_SUPPORTED_PREFIXES_BYTES)]
 
     def deduplicate(self, lines: List[str]) -> List[ProxyConfig]:
-        seen_keys: Set[str] = set()
+        seen_keys: Set[tuple] = set()
         configs = []
+        parse_config_line = self.parser.parse_config_line
+        get_config_key = self._get_config_key
 
         for line in lines:
-            try:
-                config = self.parser.parse_config_line(line)
-                if config:
-                    key = self._get_config_key(config)
-                    if key not in seen_keys:
-                        seen_keys.add(key)
-                        configs.append(config)
-            except Exception:
-                pass
+            if not line.startswith(SUPPORTED_PREFIXES):
+                continue
+
+            config = parse_config_line(line)
+            if config:
+                key = get_config_key(config)
+                if key not in seen_keys:
+                    seen_keys.add(key)
+                    configs.append(config)
 
         return configs
 
     @staticmethod
-    def _get_config_key(config: ProxyConfig) -> str:
+    def _get_config_key(config: ProxyConfig) -> tuple:
         if config.protocol == 'vless':
-            return f"vless:{config.uuid}:{config.server}:{config.port}:{config.network}:{config.security}:{config.path}:{config.host}"
+            return ('vless', config.uuid, config.server, config.port, config.network, config.security, config.path, config.host)
         elif config.protocol == 'vmess':
-            return f"vmess:{config.uuid}:{config.server}:{config.port}:{config.network}:{config.path}:{config.host}"
+            return ('vmess', config.uuid, config.server, config.port, config.network, config.path, config.host)
         elif config.protocol == 'ss':
-            return f"ss:{config.method}:{config.server}:{config.port}"
+            return ('ss', config.method, config.server, config.port)
         elif config.protocol == 'trojan':
-            return f"trojan:{config.password}:{config.server}:{config.port}:{config.network}:{config.path}:{config.sni}"
+            return ('trojan', config.password, config.server, config.port, config.network, config.path, config.sni)
         else:
-            return config.raw_config
-
-
-
+            return (config.protocol, config.raw_config)
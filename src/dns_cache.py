@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+
+import socket
+import time
+from typing import Dict, Optional, Tuple
+
+
+DNS_TTL = 300.0
+
+_cache: Dict[str, Tuple[str, float]] = {}
+
+
+def get_cached_host(host: str) -> Optional[str]:
+    cached = _cache.get(host)
+    if cached and time.monotonic() - cached[1] < DNS_TTL:
+        return cached[0]
+    return None
+
+
+def resolve_host(host: str) -> str:
+    ip = get_cached_host(host)
+    if ip is None:
+        ip = socket.getaddrinfo(host, None, socket.AF_INET)[0][4][0]
+        _cache[host] = (ip, time.monotonic())
+    return ip
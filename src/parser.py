@@ -1,13 +1,88 @@
 #!/usr/bin/env python3
 
-import base64
+import binascii
+import hashlib
 import json
+import re
 import urllib.parse
-from dataclasses import dataclass
-from typing import Optional
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
 
 
-@dataclass
+_URI_RE = re.compile(
+    r'^([A-Za-z][A-Za-z0-9+.-]*)://'
+    r'(?:([^/?#\[\]]*)@)?'
+    r'(\[[0-9A-Fa-f:.]+(?:%[^\]/?#]*)?\]|[^:/?#\[\]@]*)'
+    r'(?::([0-9]*))?'
+    r'(/[^?#]*)?'
+    r'(?:\?([^#]*))?'
+    r'(?:#(.*))?$',
+    re.DOTALL
+)
+
+
+def _split_url(url: str) -> Optional[Tuple[Optional[str], Optional[str], str, Optional[int], str, str]]:
+    match = _URI_RE.match(url)
+    if not match:
+        return None
+
+    userinfo, host, port_str, query, fragment = match.group(2, 3, 4, 6, 7)
+
+    username = password = None
+    if userinfo is not None:
+        username, has_password, password = userinfo.partition(':')
+        if not has_password:
+            password = None
+
+    if host.startswith('['):
+        host = host[1:-1]
+
+    host, percent, zone = host.partition('%')
+
+    port = None
+    if port_str:
+        port = int(port_str)
+        if port > 65535:
+            raise ValueError(f"Port out of range: {port}")
+
+    return username, password, host.lower() + percent + zone, port, query or '', fragment or ''
+
+
+def _parse_query(query: str) -> Dict[str, str]:
+    params = {}
+    for pair in query.split('&'):
+        name, _, value = pair.partition('=')
+        if not value:
+            continue
+        if '%' in name or '+' in name:
+            name = urllib.parse.unquote_plus(name)
+        if name in params:
+            continue
+        if '%' in value or '+' in value:
+            value = urllib.parse.unquote_plus(value)
+        params[name] = value
+    return params
+
+
+SUPPORTED_PREFIXES = ('vless://', 'vmess://', 'ss://', 'trojan://')
+
+_VMESS_STR_FIELDS = ('ps', 'add', 'id', 'net', 'tls', 'path', 'host')
+
+
+def _b64decode(data: str) -> bytes:
+    raw = data.encode('ascii')
+    return binascii.a2b_base64(raw + b'=' * (-len(raw) & 3))
+
+
+def _uuid_bytes(uuid: str) -> Optional[bytes]:
+    try:
+        raw = bytes.fromhex(uuid.replace('-', ''))
+    except ValueError:
+        return None
+    return raw if len(raw) == 16 else None
+
+
+@dataclass(slots=True)
 class ProxyConfig:
     protocol: str
     name: str
@@ -30,39 +105,43 @@ class ProxyConfig:
     sid: Optional[str] = None
     fp: Optional[str] = None
 
+    uuid_bytes: Optional[bytes] = field(default=None, init=False, repr=False, compare=False)
+    trojan_auth: Optional[bytes] = field(default=None, init=False, repr=False, compare=False)
+    xray_outbound: Optional[dict] = field(default=None, init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        if self.protocol == 'vless' and self.uuid:
+            self.uuid_bytes = _uuid_bytes(self.uuid)
+        elif self.protocol == 'trojan':
+            password_hash = hashlib.sha224(self.password.encode()).hexdigest().encode() if self.password else b""
+            self.trojan_auth = password_hash + b"\r\n"
+
 
 class ConfigParser:
     @staticmethod
     def parse_config_line(line: str) -> Optional[ProxyConfig]:
         line = line.strip()
-        if not line:
+        scheme, separator, _ = line.partition('://')
+        if not separator:
             return None
 
-        if line.startswith('vless://'):
-            return ConfigParser._parse_vless(line)
-        elif line.startswith('vmess://'):
-            return ConfigParser._parse_vmess(line)
-        elif line.startswith('ss://'):
-            return ConfigParser._parse_ss(line)
-        elif line.startswith('trojan://'):
-            return ConfigParser._parse_trojan(line)
-
-        return None
+        parser = ConfigParser._PARSERS.get(scheme)
+        return parser(line) if parser else None
 
     @staticmethod
     def _parse_vless(url: str) -> Optional[ProxyConfig]:
         try:
-            parsed = urllib.parse.urlparse(url)
+            parts = _split_url(url)
+            if not parts:
+                return None
 
-            uuid = parsed.username
-            server = parsed.hostname
-            port = parsed.port
+            uuid, _, server, port, query, fragment = parts
 
             if not all([uuid, server, port]):
                 return None
 
-            params = urllib.parse.parse_qs(parsed.query)
-            name = urllib.parse.unquote(parsed.fragment) if parsed.fragment else f"vless_{server}"
+            params = _parse_query(query)
+            name = urllib.parse.unquote(fragment) if fragment else f"vless_{server}"
 
             config = ProxyConfig(
                 protocol='vless',
@@ -71,31 +150,31 @@ class ConfigParser:
                 port=port,
                 raw_config=url,
                 uuid=uuid,
-                network=params.get('type', ['tcp'])[0],
-                security=params.get('security', ['none'])[0],
-                path=params.get('path', [''])[0],
-                host=params.get('host', [''])[0],
-                sni=params.get('sni', [''])[0] or params.get('peer', [''])[0],
-                flow=params.get('flow', [None])[0],
-                pbk=params.get('pbk', [None])[0],
-                sid=params.get('sid', [None])[0],
-                fp=params.get('fp', [None])[0],
-                tls=params.get('security', ['none'])[0] in ['tls', 'xtls', 'reality']
+                network=params.get('type', 'tcp'),
+                security=params.get('security', 'none'),
+                path=params.get('path', ''),
+                host=params.get('host', ''),
+                sni=params.get('sni') or params.get('peer', ''),
+                flow=params.get('flow'),
+                pbk=params.get('pbk'),
+                sid=params.get('sid'),
+                fp=params.get('fp'),
+                tls=params.get('security', 'none') in ['tls', 'xtls', 'reality']
             )
             return config
-        except Exception:
+        except ValueError:
             return None
 
     @staticmethod
     def _parse_vmess(url: str) -> Optional[ProxyConfig]:
         try:
-            b64_data = url[8:]
-            padding = 4 - len(b64_data) % 4
-            if padding != 4:
-                b64_data += '=' * padding
+            data = json.loads(_b64decode(url[8:]))
+            if not isinstance(data, dict):
+                return None
 
-            json_str = base64.b64decode(b64_data).decode('utf-8')
-            data = json.loads(json_str)
+            data = {key: value for key, value in data.items() if value is not None}
+            if any(not isinstance(data.get(key, ''), str) for key in _VMESS_STR_FIELDS):
+                return None
 
             config = ProxyConfig(
                 protocol='vmess',
@@ -112,33 +191,30 @@ class ConfigParser:
                 tls=data.get('tls', '') == 'tls'
             )
             return config
-        except Exception:
+        except (ValueError, TypeError, OverflowError, RecursionError):
             return None
 
     @staticmethod
     def _parse_ss(url: str) -> Optional[ProxyConfig]:
         try:
-            parsed = urllib.parse.urlparse(url)
+            parts = _split_url(url)
+            if not parts:
+                return None
 
-            server = parsed.hostname
-            port = parsed.port
-            name = urllib.parse.unquote(parsed.fragment) if parsed.fragment else f"ss_{server}"
+            user_info, url_password, server, port, _, fragment = parts
+            name = urllib.parse.unquote(fragment) if fragment else f"ss_{server}"
 
-            if not server or not port:
+            if not server or not port or user_info is None:
                 return None
 
-            user_info = parsed.username
-            if parsed.password:
+            if url_password:
                 method = urllib.parse.unquote(user_info)
-                password = urllib.parse.unquote(parsed.password)
+                password = urllib.parse.unquote(url_password)
             else:
                 try:
-                    padding = 4 - len(user_info) % 4
-                    if padding != 4:
-                        user_info += '=' * padding
-                    decoded = base64.b64decode(user_info).decode('utf-8')
+                    decoded = _b64decode(user_info).decode('utf-8')
                     method, password = decoded.split(':', 1)
-                except Exception:
+                except ValueError:
                     method = 'aes-256-gcm'
                     password = user_info
 
@@ -152,23 +228,23 @@ class ConfigParser:
                 password=password
             )
             return config
-        except Exception:
+        except ValueError:
             return None
 
     @staticmethod
     def _parse_trojan(url: str) -> Optional[ProxyConfig]:
         try:
-            parsed = urllib.parse.urlparse(url)
+            parts = _split_url(url)
+            if not parts:
+                return None
 
-            password = parsed.username
-            server = parsed.hostname
-            port = parsed.port
+            password, _, server, port, query, fragment = parts
 
             if not all([password, server, port]):
                 return None
 
-            params = urllib.parse.parse_qs(parsed.query)
-            name = urllib.parse.unquote(parsed.fragment) if parsed.fragment else f"trojan_{server}"
+            params = _parse_query(query)
+            name = urllib.parse.unquote(fragment) if fragment else f"trojan_{server}"
 
             config = ProxyConfig(
                 protocol='trojan',
@@ -177,12 +253,19 @@ class ConfigParser:
                 port=port,
                 raw_config=url,
                 password=password,
-                network=params.get('type', ['tcp'])[0],
-                path=params.get('path', [''])[0],
-                host=params.get('host', [''])[0],
-                sni=params.get('sni', [''])[0] or params.get('peer', [''])[0],
+                network=params.get('type', 'tcp'),
+                path=params.get('path', ''),
+                host=params.get('host', ''),
+                sni=params.get('sni') or params.get('peer', ''),
                 tls=True
             )
             return config
-        except Exception:
+        except ValueError:
             return None
+
+    _PARSERS = {
+        'vless': _parse_vless,
+        'vmess': _parse_vmess,
+        'ss': _parse_ss,
+        'trojan': _parse_trojan
+    }
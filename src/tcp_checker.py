@@ -1,24 +1,52 @@
 #!/usr/bin/env python3
 
+import asyncio
 import socket
 import ssl
 import struct
 import time
-from typing import Tuple
+from typing import Callable, List, Optional, Tuple
 
+from .dns_cache import get_cached_host, resolve_host
 from .parser import ProxyConfig
 
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+_PACK_H = struct.Struct(">H").pack
+
+_TROJAN_PROBE_TARGET = b"\x03\x0bwww.google.com\x01\xbb"
+_VLESS_PROBE_TAIL = bytes([0, 1, 3, 11]) + b"google.com" + _PACK_H(80)
+
+_FD_HEADROOM = 64
+
+
+def _socket_budget(requested: int) -> int:
+    if resource is None:
+        return requested
+    soft_limit, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft_limit == resource.RLIM_INFINITY:
+        return requested
+    return max(1, min(requested, soft_limit - _FD_HEADROOM))
+
 
 class TCPPreChecker:
-    def __init__(self, timeout: float = 5.0):
+    def __init__(self, timeout: float = 5.0, concurrency: int = 500):
         self.timeout = timeout
+        self.concurrency = concurrency
+        self._ssl_ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+        self._ssl_ctx.check_hostname = False
+        self._ssl_ctx.verify_mode = ssl.CERT_NONE
 
     def test_config_tcp(self, proxy: ProxyConfig) -> Tuple[bool, str]:
         try:
             start_time = time.time()
 
             try:
-                server_ip = socket.getaddrinfo(proxy.server, None, socket.AF_INET)[0][4][0]
+                server_ip = resolve_host(proxy.server)
             except Exception:
                 return False, "DNS resolution failed"
 
@@ -32,32 +60,17 @@ class TCPPreChecker:
             except Exception as e:
                 return False, f"TCP failed: {str(e)[:30]}"
 
-            if proxy.tls or proxy.security in ['tls', 'xtls', 'reality']:
+            if self._uses_tls(proxy):
                 try:
-                    context = ssl.create_default_context()
-                    context.check_hostname = False
-                    context.verify_mode = ssl.CERT_NONE
-
                     sni = proxy.sni or proxy.host or proxy.server
-                    with context.wrap_socket(sock, server_hostname=sni) as ssock:
+                    with self._ssl_ctx.wrap_socket(sock, server_hostname=sni) as ssock:
                         cipher = ssock.cipher()
                         if not cipher:
                             return False, "SSL handshake failed"
 
-                        if proxy.protocol == 'trojan':
-                            import hashlib
-                            password_hash = hashlib.sha224(proxy.password.encode()).hexdigest() if proxy.password else ""
-                            target = b"\x03\x0bwww.google.com\x01\xbb"
-                            ssock.send(password_hash.encode() + b"\r\n" + target)
-                        elif proxy.protocol == 'vless' and proxy.uuid:
-                            try:
-                                import uuid
-                                uid = uuid.UUID(proxy.uuid).bytes
-                                header = bytes([0]) + uid + bytes([0, 1])
-                                header += bytes([3, 11]) + b"google.com" + struct.pack(">H", 80)
-                                ssock.send(header)
-                            except Exception:
-                                pass
+                        probe = self._build_probe(proxy)
+                        if probe:
+                            ssock.send(probe)
 
                         elapsed = (time.time() - start_time) * 1000
                         return True, f"SSL OK - {elapsed:.0f}ms"
@@ -71,3 +84,86 @@ class TCPPreChecker:
 
         except Exception as e:
             return False, str(e)[:40]
+
+    async def test_config_tcp_async(self, proxy: ProxyConfig) -> Tuple[bool, str]:
+        try:
+            start_time = time.time()
+
+            try:
+                server_ip = get_cached_host(proxy.server)
+                if server_ip is None:
+                    loop = asyncio.get_running_loop()
+                    server_ip = await loop.run_in_executor(None, resolve_host, proxy.server)
+            except Exception:
+                return False, "DNS resolution failed"
+
+            use_tls = self._uses_tls(proxy)
+            try:
+                if use_tls:
+                    sni = proxy.sni or proxy.host or proxy.server
+                    connect = asyncio.open_connection(server_ip, proxy.port, ssl=self._ssl_ctx, server_hostname=sni)
+                else:
+                    connect = asyncio.open_connection(server_ip, proxy.port)
+                _, writer = await asyncio.wait_for(connect, self.timeout)
+            except asyncio.TimeoutError:
+                return False, "TCP timeout"
+            except ssl.SSLError as e:
+                return False, f"SSL error: {str(e)[:30]}"
+            except Exception as e:
+                return False, f"TCP failed: {str(e)[:30]}"
+
+            try:
+                if not use_tls:
+                    elapsed = (time.time() - start_time) * 1000
+                    return True, f"TCP OK - {elapsed:.0f}ms"
+
+                if not writer.get_extra_info('cipher'):
+                    return False, "SSL handshake failed"
+
+                probe = self._build_probe(proxy)
+                if probe:
+                    writer.write(probe)
+                    await asyncio.wait_for(writer.drain(), self.timeout)
+
+                elapsed = (time.time() - start_time) * 1000
+                return True, f"SSL OK - {elapsed:.0f}ms"
+            except Exception as e:
+                return False, f"SSL error: {str(e)[:30]}"
+            finally:
+                writer.transport.abort()
+
+        except Exception as e:
+            return False, str(e)[:40]
+
+    def run_batch(self, proxies: List[ProxyConfig],
+                  on_progress: Optional[Callable[[int, int], None]] = None) -> List[Tuple[bool, str]]:
+        return asyncio.run(self._run_batch(proxies, on_progress))
+
+    async def _run_batch(self, proxies: List[ProxyConfig],
+                         on_progress: Optional[Callable[[int, int], None]]) -> List[Tuple[bool, str]]:
+        semaphore = asyncio.Semaphore(_socket_budget(self.concurrency))
+        total = len(proxies)
+        done = 0
+
+        async def check(proxy: ProxyConfig) -> Tuple[bool, str]:
+            nonlocal done
+            async with semaphore:
+                result = await self.test_config_tcp_async(proxy)
+            done += 1
+            if on_progress:
+                on_progress(done, total)
+            return result
+
+        return await asyncio.gather(*(check(proxy) for proxy in proxies))
+
+    @staticmethod
+    def _uses_tls(proxy: ProxyConfig) -> bool:
+        return bool(proxy.tls or proxy.security in ['tls', 'xtls', 'reality'])
+
+    @staticmethod
+    def _build_probe(proxy: ProxyConfig) -> Optional[bytes]:
+        if proxy.protocol == 'trojan':
+            return proxy.trojan_auth + _TROJAN_PROBE_TARGET
+        elif proxy.protocol == 'vless' and proxy.uuid_bytes:
+            return b"\x00" + proxy.uuid_bytes + _VLESS_PROBE_TAIL
+        return None
@@ -2,12 +2,14 @@
 
 import json
 import os
+import queue
+import shutil
 import socket
 import struct
 import subprocess
-import tempfile
+import threading
 import time
-from typing import Tuple, Optional
+from typing import List, Tuple, Optional
 
 from .parser import ProxyConfig
 
@@ -15,7 +17,65 @@ from .parser import ProxyConfig
 class XrayConfigBuilder:
     @staticmethod
     def build_config(proxy: ProxyConfig, local_port: int = 10808) -> dict:
-        inbound = {
+        inbound = XrayConfigBuilder._build_socks_inbound(local_port)
+        outbound = XrayConfigBuilder.get_outbound(proxy)
+
+        return {
+            "log": {"loglevel": "error"},
+            "inbounds": [inbound],
+            "outbounds": [outbound, {"protocol": "freedom", "tag": "direct"}],
+            "routing": {
+                "rules": [
+                    {"type": "field", "outboundTag": "direct", "ip": ["geoip:private"]}
+                ]
+            }
+        }
+
+    @staticmethod
+    def get_outbound(proxy: ProxyConfig) -> dict:
+        if proxy.xray_outbound is None:
+            proxy.xray_outbound = XrayConfigBuilder._build_outbound(proxy)
+        return proxy.xray_outbound
+
+    @staticmethod
+    def build_daemon_config(socks_ports: List[int], api_port: int) -> dict:
+        inbounds = []
+        slot_rules = []
+        for slot, socks_port in enumerate(socks_ports):
+            inbound = XrayConfigBuilder._build_socks_inbound(socks_port)
+            inbound["tag"] = f"in{slot}"
+            inbounds.append(inbound)
+            slot_rules.append({"type": "field", "inboundTag": [f"in{slot}"], "outboundTag": f"slot{slot}"})
+
+        inbounds.append({
+            "listen": "127.0.0.1",
+            "port": api_port,
+            "protocol": "dokodemo-door",
+            "settings": {"address": "127.0.0.1"},
+            "tag": "api"
+        })
+
+        return {
+            "log": {"loglevel": "error"},
+            "api": {"tag": "api", "services": ["HandlerService"]},
+            "inbounds": inbounds,
+            "outbounds": [
+                {"protocol": "blackhole", "tag": "block"},
+                {"protocol": "freedom", "tag": "direct"}
+            ],
+            "routing": {
+                "rules": [
+                    {"type": "field", "inboundTag": ["api"], "outboundTag": "api"},
+                    {"type": "field", "outboundTag": "direct", "ip": ["geoip:private"]},
+                    *slot_rules
+                ]
+            }
+        }
+
+    @staticmethod
+    def _build_socks_inbound(local_port: int) -> dict:
+        return {
+            "listen": "127.0.0.1",
             "port": local_port,
             "protocol": "socks",
             "settings": {
@@ -29,31 +89,12 @@ class XrayConfigBuilder:
             }
         }
 
-        outbound = XrayConfigBuilder._build_outbound(proxy)
-
-        return {
-            "log": {"loglevel": "error"},
-            "inbounds": [inbound],
-            "outbounds": [outbound, {"protocol": "freedom", "tag": "direct"}],
-            "routing": {
-                "rules": [
-                    {"type": "field", "outboundTag": "direct", "ip": ["geoip:private"]}
-                ]
-            }
-        }
-
     @staticmethod
     def _build_outbound(proxy: ProxyConfig) -> dict:
-        if proxy.protocol == 'vless':
-            return XrayConfigBuilder._build_vless_outbound(proxy)
-        elif proxy.protocol == 'vmess':
-            return XrayConfigBuilder._build_vmess_outbound(proxy)
-        elif proxy.protocol == 'ss':
-            return XrayConfigBuilder._build_ss_outbound(proxy)
-        elif proxy.protocol == 'trojan':
-            return XrayConfigBuilder._build_trojan_outbound(proxy)
-        else:
+        builder = XrayConfigBuilder._OUTBOUND_BUILDERS.get(proxy.protocol)
+        if builder is None:
             raise ValueError(f"Unsupported protocol: {proxy.protocol}")
+        return builder(proxy)
 
     @staticmethod
     def _build_vless_outbound(proxy: ProxyConfig) -> dict:
@@ -209,105 +250,317 @@ class XrayConfigBuilder:
             "tag": "proxy"
         }
 
+    _OUTBOUND_BUILDERS = {
+        'vless': _build_vless_outbound,
+        'vmess': _build_vmess_outbound,
+        'ss': _build_ss_outbound,
+        'trojan': _build_trojan_outbound
+    }
 
-class XrayValidator:
-    def __init__(self, xray_path: str = "xray"):
+
+_PACK_H = struct.Struct('>H').pack
+
+_XRAY_MEMORY = 64 * 1024 * 1024
+
+_PROBE_HOST = b"www.google.com"
+_SOCKS_REQUEST = (bytes([0x05, 0x01, 0x00]) +
+                  bytes([0x05, 0x01, 0x00, 0x03, len(_PROBE_HOST)]) + _PROBE_HOST + _PACK_H(80))
+_HTTP_REQUEST = b"GET /generate_204 HTTP/1.1\r\nHost: " + _PROBE_HOST + b"\r\nConnection: close\r\n\r\n"
+
+_POPEN_KWARGS = {
+    "close_fds": False,
+    "creationflags": subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
+}
+
+_encode_json = json.JSONEncoder(separators=(',', ':'), check_circular=False).encode
+
+
+def _dump_json(obj: dict) -> bytes:
+    return _encode_json(obj).encode()
+
+
+def _available_memory() -> Optional[int]:
+    try:
+        with open('/proc/meminfo', 'rb') as f:
+            for line in f:
+                if line.startswith(b'MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def _default_pool_size() -> int:
+    cpus = os.cpu_count() or 1
+    available = _available_memory()
+    if available is None:
+        return max(2, cpus)
+    return max(2, min(cpus, available // _XRAY_MEMORY))
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    data = b""
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("SOCKS connection closed")
+        data += chunk
+    return data
+
+
+def _wait_for_port(port: int, process: subprocess.Popen, timeout: float) -> bool:
+    address = ('127.0.0.1', port)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            return False
+        try:
+            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+                sock.settimeout(0.05)
+                sock.connect(address)
+                return True
+        except OSError:
+            time.sleep(0.02)
+    return False
+
+
+def _launch_xray(xray_path: str, config: dict) -> subprocess.Popen:
+    process = subprocess.Popen(
+        [xray_path, 'run', '-c', 'stdin:', '-format', 'json'],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        **_POPEN_KWARGS
+    )
+
+    try:
+        process.stdin.write(_dump_json(config))
+        process.stdin.close()
+    except OSError:
+        pass
+
+    return process
+
+
+class XrayDaemon:
+    def __init__(self, xray_path: str, socks_ports: List[int], api_port: int):
         self.xray_path = xray_path
-        self.timeout = 10
+        self.socks_ports = socks_ports
+        self.api_port = api_port
+        self.process: Optional[subprocess.Popen] = None
 
-    def test_config_with_xray(self, proxy: ProxyConfig) -> Tuple[bool, float]:
+    def start(self, timeout: float = 5.0) -> bool:
+        self.launch()
+        return self.wait_ready(timeout)
+
+    def launch(self):
+        config = XrayConfigBuilder.build_daemon_config(self.socks_ports, self.api_port)
         try:
-            local_port = self._find_free_port()
-            config = XrayConfigBuilder.build_config(proxy, local_port)
+            self.process = _launch_xray(self.xray_path, config)
+        except Exception:
+            self.process = None
 
-            config_fd, config_path = tempfile.mkstemp(suffix='.json')
-            try:
-                with os.fdopen(config_fd, 'w') as f:
-                    json.dump(config, f)
+    def wait_ready(self, timeout: float = 5.0) -> bool:
+        ready = (self.process is not None and
+                 all(_wait_for_port(port, self.process, timeout) for port in self.socks_ports) and
+                 _wait_for_port(self.api_port, self.process, timeout))
 
-                process = subprocess.Popen(
-                    [self.xray_path, '-c', config_path],
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    creationflags=subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
-                )
+        placeholders = [{"protocol": "blackhole", "tag": f"slot{slot}"} for slot in range(len(self.socks_ports))]
+        if (ready and self._api('ado', 'stdin:', data=_dump_json({"outbounds": placeholders})) and
+                self.set_outbound(0, {"protocol": "blackhole"})):
+            return True
 
-                time.sleep(0.5)
+        self.stop()
+        return False
 
-                if process.poll() is not None:
-                    return False, -1
+    def is_running(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def set_outbound(self, slot: int, outbound: dict) -> bool:
+        tag = f"slot{slot}"
+        if not self._api('rmo', 'stdin:', data=_dump_json({"outbounds": [{"tag": tag}]})):
+            return False
+
+        if self._api('ado', 'stdin:', data=_dump_json({"outbounds": [dict(outbound, tag=tag)]})):
+            return True
+
+        self._api('ado', 'stdin:', data=_dump_json({"outbounds": [{"protocol": "blackhole", "tag": tag}]}))
+        return False
+
+    def stop(self):
+        if self.process is None:
+            return
+
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=3)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        self.process = None
+
+    def _api(self, command: str, *args: str, data: Optional[bytes] = None) -> bool:
+        try:
+            result = subprocess.run(
+                [self.xray_path, 'api', command, f'--server=127.0.0.1:{self.api_port}', *args],
+                input=data,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                timeout=5,
+                **_POPEN_KWARGS
+            )
+            return result.returncode == 0
+        except Exception:
+            return False
+
+
+class XrayValidator:
+    def __init__(self, xray_path: str = "xray", pool_size: Optional[int] = None):
+        self.xray_path = shutil.which(xray_path) or xray_path
+        self.pool_size = pool_size or _default_pool_size()
+        self.timeout = 10
+        self._daemon: Optional[XrayDaemon] = None
+        self._ready = False
+        self._restart_lock = threading.Lock()
+        self._idle_slots: "queue.Queue[int]" = queue.Queue()
+        self._oneshot_slots = threading.BoundedSemaphore(self.pool_size)
+
+    def launch(self):
+        if self._daemon is not None:
+            return
+
+        ports = self._find_free_ports(self.pool_size + 1)
+        self._daemon = XrayDaemon(self.xray_path, ports[:-1], ports[-1])
+        self._daemon.launch()
+
+    def start(self) -> bool:
+        self.launch()
+
+        self._ready = self._daemon.wait_ready()
+        if self._ready:
+            for slot in range(self.pool_size):
+                self._idle_slots.put(slot)
+
+        return self._ready
+
+    def stop(self):
+        if self._daemon is not None:
+            self._daemon.stop()
+        self._daemon = None
+        self._ready = False
+        self._idle_slots = queue.Queue()
+
+    def test_config_with_xray(self, proxy: ProxyConfig) -> Tuple[bool, float]:
+        if self._ready:
+            return self._test_with_daemon(proxy)
 
-                latency = self._test_through_proxy('127.0.0.1', local_port)
+        try:
+            with self._oneshot_slots:
+                local_port = self._find_free_ports(1)[0]
+                config = XrayConfigBuilder.build_config(proxy, local_port)
+                process = _launch_xray(self.xray_path, config)
 
-                process.terminate()
                 try:
-                    process.wait(timeout=3)
-                except subprocess.TimeoutExpired:
+                    if not _wait_for_port(local_port, process, 2.0):
+                        return False, -1
+
+                    latency = self._test_through_proxy('127.0.0.1', local_port)
+                finally:
                     process.kill()
+                    process.wait()
+
+            return latency > 0, latency
+
+        except Exception:
+            return False, -1
 
-                return latency > 0, latency
+    def _test_with_daemon(self, proxy: ProxyConfig) -> Tuple[bool, float]:
+        try:
+            outbound = XrayConfigBuilder.get_outbound(proxy)
+
+            daemon = self._daemon
+            slot = self._idle_slots.get()
+            try:
+                with self._restart_lock:
+                    if not daemon.is_running() and not daemon.start():
+                        return False, -1
 
+                if not daemon.set_outbound(slot, outbound):
+                    return False, -1
+
+                latency = self._test_through_proxy('127.0.0.1', daemon.socks_ports[slot])
             finally:
-                try:
-                    os.unlink(config_path)
-                except Exception:
-                    pass
+                self._idle_slots.put(slot)
+
+            return latency > 0, latency
 
         except Exception:
             return False, -1
 
-    def _find_free_port(self) -> int:
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.bind(('127.0.0.1', 0))
-        port = sock.getsockname()[1]
-        sock.close()
-        return port
+    def _find_free_ports(self, count: int) -> List[int]:
+        socks = []
+        try:
+            for _ in range(count):
+                sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                socks.append(sock)
+                sock.bind(('127.0.0.1', 0))
+            return [sock.getsockname()[1] for sock in socks]
+        finally:
+            for sock in socks:
+                sock.close()
 
     def _test_through_proxy(self, proxy_host: str, proxy_port: int) -> float:
         try:
             start_time = time.time()
 
             sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
             sock.settimeout(self.timeout)
             sock.connect((proxy_host, proxy_port))
 
-            sock.sendall(bytes([0x05, 0x01, 0x00]))
-            response = sock.recv(2)
-            if response[0] != 0x05 or response[1] != 0x00:
-                sock.close()
-                return -1
+            sock.sendall(_SOCKS_REQUEST)
 
-            target_addr = socket.getaddrinfo("www.google.com", 80, socket.AF_INET)[0][4][0]
-            request = bytes([0x05, 0x01, 0x00, 0x01]) + socket.inet_aton(target_addr) + struct.pack('>H', 80)
-            sock.sendall(request)
-
-            response = sock.recv(10)
-            if response[1] != 0x00:
+            response = _recv_exact(sock, 6)
+            if (response[0] != 0x05 or response[1] != 0x00 or
+                    response[2] != 0x05 or response[3] != 0x00):
                 sock.close()
                 return -1
 
-            http_request = "GET /generate_204 HTTP/1.1\r\nHost: www.google.com\r\nConnection: close\r\n\r\n"
-            sock.sendall(http_request.encode())
+            address_type = response[5]
+            if address_type == 0x01:
+                _recv_exact(sock, 6)
+            elif address_type == 0x04:
+                _recv_exact(sock, 18)
+            else:
+                _recv_exact(sock, _recv_exact(sock, 1)[0] + 2)
+
+            sock.sendall(_HTTP_REQUEST)
 
             sock.settimeout(10)
-            response_data = b""
+            buffer = bytearray(1024)
+            view = memoryview(buffer)
+            received = 0
+            replied = False
             try:
-                while True:
-                    chunk = sock.recv(4096)
-                    if not chunk:
+                while received < len(buffer):
+                    count = sock.recv_into(view[received:])
+                    if not count:
+                        break
+                    received += count
+                    if buffer.find(b"HTTP/1.1", 0, received) != -1 or buffer.find(b"204", 0, received) != -1:
+                        replied = True
                         break
-                    response_data += chunk
             except socket.timeout:
                 pass
 
-            sock.close()
-
             elapsed = (time.time() - start_time) * 1000
+            sock.close()
 
-            if b"204" in response_data or b"HTTP/1.1" in response_data:
-                return elapsed
-
-            return -1
+            return elapsed if replied else -1
 
         except Exception:
             return -1
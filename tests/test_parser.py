@@ -0,0 +1,81 @@
+import base64
+import json
+import unittest
+import urllib.parse
+
+from src.config_sources import ConfigSourceManager
+from src.parser import ConfigParser, _split_url
+
+
+def _vmess_link(payload: str) -> str:
+    return "vmess://" + base64.b64encode(payload.encode()).decode()
+
+
+class MalformedVmessTest(unittest.TestCase):
+    VALID = {"add": "example.com", "port": "443", "id": "11111111-1111-1111-1111-111111111111", "net": "ws", "ps": "ok"}
+
+    MALFORMED = [
+        json.dumps(dict(VALID, add=["a"])),
+        json.dumps(dict(VALID, net={"x": 1})),
+        json.dumps(VALID).replace('"443"', '1e999'),
+        '[' * 100000 + ']' * 100000,
+        json.dumps(["not", "an", "object"]),
+    ]
+
+    def test_parser_rejects_malformed_payloads(self):
+        for payload in self.MALFORMED:
+            with self.subTest(payload=payload[:40]):
+                self.assertIsNone(ConfigParser.parse_config_line(_vmess_link(payload)))
+
+    def test_parser_treats_null_fields_as_missing(self):
+        payload = json.dumps(dict(self.VALID, tls=None, host=None, path=None, ps=None))
+        config = ConfigParser.parse_config_line(_vmess_link(payload))
+
+        self.assertIsNotNone(config)
+        self.assertEqual(config.name, "vmess_example.com")
+        self.assertEqual((config.security, config.host, config.path, config.tls), ("none", "", "", False))
+
+    def test_deduplicate_skips_malformed_payloads(self):
+        lines = [_vmess_link(payload) for payload in self.MALFORMED]
+        lines.append(_vmess_link(json.dumps(self.VALID)))
+
+        configs = ConfigSourceManager().deduplicate(lines)
+
+        self.assertEqual([config.server for config in configs], ["example.com"])
+
+
+class SplitUrlTest(unittest.TestCase):
+    URLS = [
+        "vless://11111111-1111-1111-1111-111111111111@Example.COM:443?type=ws&path=%2Fws&security=tls#My%20Node",
+        "vless://uuid@1.2.3.4:8443?security=reality&pbk=abc&sid=01",
+        "vless://uuid@[2001:DB8::1]:443?type=grpc#v6",
+        "trojan://pass@host.example:443",
+        "trojan://p%40ss@host.example:443?sni=a.b&peer=c.d#name#with#hashes",
+        "ss://YWVzLTI1Ni1nY206cGFzcw@ss.example:8388#ss",
+        "ss://aes-256-gcm:secret@ss.example:8388/?plugin=x",
+        "vless://uuid@host:443/?type=tcp",
+        "vless://uuid@host",
+        "vless://u:p:q@host:80?a=1&a=2&b=&c",
+    ]
+
+    @staticmethod
+    def _urlparse_parts(url: str):
+        parsed = urllib.parse.urlparse(url)
+        return parsed.username, parsed.password, parsed.hostname, parsed.port, parsed.query, parsed.fragment
+
+    def test_matches_urlparse(self):
+        for url in self.URLS:
+            with self.subTest(url=url):
+                self.assertEqual(_split_url(url), self._urlparse_parts(url))
+
+    def test_rejects_out_of_range_port(self):
+        with self.assertRaises(ValueError):
+            _split_url("vless://uuid@host:70000")
+
+    def test_rejects_non_ascii_port_digits(self):
+        self.assertIsNone(_split_url("vless://uuid@host:\u0663"))
+        self.assertIsNone(ConfigParser.parse_config_line("trojan://pass@host:\u0664\u0664\u0663"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,12 +1,11 @@
 #!/usr/bin/env python3
 
-import os
 import time
-import threading
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from operator import itemgetter
 from typing import List, Tuple
 
-from src.parser import ConfigParser, ProxyConfig
+from src.parser import ProxyConfig
 from src.config_sources import ConfigSourceManager
 from src.tcp_checker import TCPPreChecker
 from src.xray_validator import XrayValidator
@@ -15,13 +14,12 @@ from src.xray_validator import XrayValidator
 class ConfigCheckerBot:
     def __init__(self, output_file: str = "result.txt", max_workers: int = None):
         self.output_file = output_file
-        self.max_workers = max_workers or min(100, (os.cpu_count() or 4) * 3)
+        self.max_workers = max_workers or 500
         self.source_manager = ConfigSourceManager()
-        self.tcp_checker = TCPPreChecker()
+        self.tcp_checker = TCPPreChecker(concurrency=self.max_workers)
         self.xray_validator = XrayValidator()
         self.working_configs: List[Tuple[ProxyConfig, float]] = []
         self.tcp_passed_configs: List[ProxyConfig] = []
-        self.lock = threading.Lock()
         self.tested_count = 0
         self.tcp_passed_count = 0
 
@@ -40,6 +38,13 @@ class ConfigCheckerBot:
 
         print(f"\nTotal configs after deduplication: {len(configs)}")
 
+        self.xray_validator.launch()
+        try:
+            self._check_configs(configs)
+        finally:
+            self.xray_validator.stop()
+
+    def _check_configs(self, configs: List[ProxyConfig]):
         print("\nPhase 1: TCP Precheck")
         print("-" * 60)
         start_phase1 = time.time()
@@ -59,10 +64,13 @@ class ConfigCheckerBot:
         print("-" * 60)
         start_phase2 = time.time()
 
+        if not self.xray_validator.start():
+            print("Xray API unavailable, starting one Xray process per config")
+
         self._run_xray_validation(self.tcp_passed_configs)
         elapsed_phase2 = time.time() - start_phase2
 
-        self.working_configs.sort(key=lambda x: x[1])
+        self.working_configs.sort(key=itemgetter(1))
         self.save_results()
 
         print("\n" + "=" * 60)
@@ -80,46 +88,33 @@ class ConfigCheckerBot:
                 print(f"  {i}. [{config.protocol.upper()}] {config.name[:40]} - {latency:.0f}ms")
 
     def _run_tcp_precheck(self, configs: List[ProxyConfig]) -> List[ProxyConfig]:
-        passed = []
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            futures = {executor.submit(self._test_tcp, config): config for config in configs}
+        results = self.tcp_checker.run_batch(configs, self._report_tcp_progress)
+        return [config for config, (success, _) in zip(configs, results) if success]
 
-            for i, future in enumerate(as_completed(futures), 1):
-                try:
-                    result = future.result()
-                    if result:
-                        passed.append(result)
-                except Exception:
-                    pass
-
-                if i % 100 == 0:
-                    print(f"  Tested {i}/{len(configs)} configs...")
-
-        return passed
-
-    def _test_tcp(self, config: ProxyConfig) -> ProxyConfig:
-        success, msg = self.tcp_checker.test_config_tcp(config)
-        if success:
-            return config
-        return None
+    @staticmethod
+    def _report_tcp_progress(done: int, total: int):
+        if done % 100 == 0:
+            print(f"  Tested {done}/{total} configs...")
 
     def _run_xray_validation(self, configs: List[ProxyConfig]):
-        with ThreadPoolExecutor(max_workers=4) as executor:
+        total = len(configs)
+        next_report = time.monotonic() + 1.0
+
+        with ThreadPoolExecutor(max_workers=self.xray_validator.pool_size) as executor:
             futures = {executor.submit(self._test_xray, config): config for config in configs}
 
             for i, future in enumerate(as_completed(futures), 1):
                 try:
                     success, latency = future.result()
                     if success and latency > 0:
-                        config = futures[future]
-                        with self.lock:
-                            self.working_configs.append((config, latency))
+                        self.working_configs.append((futures[future], latency))
                 except Exception:
                     pass
 
-                if i % 10 == 0:
-                    with self.lock:
-                        print(f"  Verified {i}/{len(configs)} configs... ({len(self.working_configs)} working)")
+                now = time.monotonic()
+                if now >= next_report or i == total:
+                    next_report = now + 1.0
+                    print(f"  Verified {i}/{total} configs... ({len(self.working_configs)} working)")
 
     def _test_xray(self, config: ProxyConfig) -> Tuple[bool, float]:
         try:
@@ -128,15 +123,18 @@ class ConfigCheckerBot:
             return False, -1
 
     def save_results(self):
+        lines = [
+            "# V2Ray Config Checker Results\n",
+            f"# Generated: {time.strftime('%Y-%m-%d %H:%M:%S')}\n",
+            f"# Working configs: {len(self.working_configs)}\n",
+            "#" + "=" * 50 + "\n\n"
+        ]
+
+        for config, latency in self.working_configs:
+            lines.append(f"# [{config.protocol.upper()}] Latency: {latency:.0f}ms | {config.name}\n{config.raw_config}\n\n")
+
         with open(self.output_file, 'w', encoding='utf-8') as f:
-            f.write("# V2Ray Config Checker Results\n")
-            f.write(f"# Generated: {time.strftime('%Y-%m-%d %H:%M:%S')}\n")
-            f.write(f"# Working configs: {len(self.working_configs)}\n")
-            f.write("#" + "=" * 50 + "\n\n")
-
-            for config, latency in self.working_configs:
-                f.write(f"# [{config.protocol.upper()}] Latency: {latency:.0f}ms | {config.name}\n")
-                f.write(f"{config.raw_config}\n\n")
+            f.write("".join(lines))
 
 
 def main():